@@ -0,0 +1,190 @@
+# utils/admission.py
+"""
+Admission control for the scoring API.
+
+Interactive /predict calls and batch /batch-predict uploads get separate
+concurrency limits. Batch work additionally reserves an estimate of the memory
+it will need against a node-wide budget, waits in a short bounded queue when the
+batch slots or the budget are used up, and is rejected with 429 + Retry-After
+when the queue is full or the wait times out. Admitted batches are scored in
+low-priority worker processes (utils/batch_worker.py), so they never compete
+with interactive requests for the API process's GIL.
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+# Rough peak memory of a batch request relative to its CSV size:
+# raw DataFrame + preprocessing copies + SHAP matrix + JSON response
+CSV_MEMORY_FACTOR = 12
+# Rough size of one CSV row, used to estimate in-flight rows before parsing
+CSV_BYTES_PER_ROW = 120
+
+DEFAULT_MAX_INTERACTIVE = 32
+DEFAULT_MAX_BATCH = 2
+DEFAULT_BATCH_QUEUE = 4
+DEFAULT_QUEUE_TIMEOUT = 10.0
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; maps to 429 + Retry-After (413 if it can never fit)."""
+
+    def __init__(self, message, retry_after=1, status_code=429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+    def __reduce__(self):
+        # Keep retry_after/status_code when raised inside a batch worker process
+        return (Overloaded, (str(self), self.retry_after, self.status_code))
+
+
+def default_memory_budget(fraction=0.5):
+    """Share of the container memory limit (cgroup v2/v1), falling back to physical memory."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(int(value) * fraction)
+    return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * fraction)
+
+
+def gzip_uncompressed_size(file_obj):
+    """
+    Uncompressed size of a gzip upload from its ISIZE trailer (size mod 2**32 of
+    the last member). The trailer is client-controlled, so batch workers still
+    stop decompressing once the admitted size is exceeded.
+    """
+    file_obj.seek(0, os.SEEK_END)
+    upload_bytes = file_obj.tell()
+    if upload_bytes < 18:
+        file_obj.seek(0)
+        return upload_bytes
+    file_obj.seek(-4, os.SEEK_END)
+    isize = int.from_bytes(file_obj.read(4), "little")
+    file_obj.seek(0)
+    # Never reserve less than the upload itself (tiny or incompressible files)
+    return max(isize, upload_bytes)
+
+
+def estimate_batch_bytes(raw_bytes):
+    """Peak memory and row count of a batch request, from its uncompressed CSV size."""
+    return raw_bytes * CSV_MEMORY_FACTOR, raw_bytes // CSV_BYTES_PER_ROW
+
+
+class BatchTicket:
+    """Reservation held by one admitted batch request."""
+
+    def __init__(self, estimated_bytes, estimated_rows):
+        self.estimated_bytes = estimated_bytes
+        # From the upload size; the CSV is only parsed inside the batch worker process
+        self.estimated_rows = estimated_rows
+        self.started_at = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, max_interactive=DEFAULT_MAX_INTERACTIVE, max_batch=DEFAULT_MAX_BATCH,
+                 memory_budget=None, batch_queue_size=DEFAULT_BATCH_QUEUE,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.max_interactive = max_interactive
+        self.max_batch = max_batch
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.batch_queue_size = batch_queue_size
+        self.queue_timeout = queue_timeout
+
+        # Counters are only changed on the event loop
+        self.interactive_in_flight = 0
+        self.batches = set()
+        self.batch_queued = 0
+        self.reserved_bytes = 0
+        self.rejected = {"interactive": 0, "batch": 0}
+        self._avg_batch_seconds = 5.0
+        self._changed = None
+
+    def _condition(self):
+        # Created lazily so it binds to the server's event loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _retry_after(self):
+        waiting = self.batch_queued + len(self.batches)
+        return max(1, math.ceil(self._avg_batch_seconds * waiting / max(self.max_batch, 1)))
+
+    @asynccontextmanager
+    async def interactive(self):
+        if self.interactive_in_flight >= self.max_interactive:
+            self.rejected["interactive"] += 1
+            raise Overloaded("Too many concurrent prediction requests", retry_after=1)
+        self.interactive_in_flight += 1
+        try:
+            yield
+        finally:
+            self.interactive_in_flight -= 1
+
+    def _batch_can_start(self, estimated_bytes):
+        return (len(self.batches) < self.max_batch
+                and self.reserved_bytes + estimated_bytes <= self.memory_budget)
+
+    @asynccontextmanager
+    async def batch(self, estimated_bytes, estimated_rows=0):
+        if estimated_bytes > self.memory_budget:
+            self.rejected["batch"] += 1
+            raise Overloaded(
+                f"Upload needs ~{estimated_bytes / 2**20:.0f} MiB, over the node budget of "
+                f"{self.memory_budget / 2**20:.0f} MiB - split the file", status_code=413
+            )
+
+        condition = self._condition()
+        async with condition:
+            if not self._batch_can_start(estimated_bytes):
+                if self.batch_queued >= self.batch_queue_size:
+                    self.rejected["batch"] += 1
+                    raise Overloaded("Batch queue is full", retry_after=self._retry_after())
+                self.batch_queued += 1
+                try:
+                    await asyncio.wait_for(
+                        condition.wait_for(lambda: self._batch_can_start(estimated_bytes)),
+                        timeout=self.queue_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.rejected["batch"] += 1
+                    raise Overloaded("Timed out waiting for batch capacity", retry_after=self._retry_after())
+                finally:
+                    self.batch_queued -= 1
+
+            ticket = BatchTicket(estimated_bytes, estimated_rows)
+            self.batches.add(ticket)
+            self.reserved_bytes += estimated_bytes
+
+        try:
+            yield ticket
+        finally:
+            elapsed = time.monotonic() - ticket.started_at
+            self._avg_batch_seconds = 0.8 * self._avg_batch_seconds + 0.2 * elapsed
+            async with condition:
+                self.batches.discard(ticket)
+                self.reserved_bytes -= estimated_bytes
+                condition.notify_all()
+
+    def stats(self):
+        return {
+            "interactive_in_flight": self.interactive_in_flight,
+            "max_interactive": self.max_interactive,
+            "batch_in_flight": len(self.batches),
+            "batch_queued": self.batch_queued,
+            "max_batch": self.max_batch,
+            # Estimated from upload sizes (CSV_BYTES_PER_ROW), not counted rows
+            "batch_rows_in_flight": sum(ticket.estimated_rows for ticket in self.batches),
+            "reserved_bytes": self.reserved_bytes,
+            "memory_budget": self.memory_budget,
+            "rejected": dict(self.rejected),
+            "avg_batch_seconds": round(self._avg_batch_seconds, 3)
+        }
@@ -0,0 +1,128 @@
+# api_client.py
+
+import gzip
+import hashlib
+import os
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = os.getenv("CHURN_API_URL", "http://127.0.0.1:8000")
+
+# (connect, read) timeouts in seconds - batch scoring can legitimately take a while
+PREDICT_TIMEOUT = (3.05, 30)
+BATCH_TIMEOUT = (3.05, 600)
+
+# Cache limits - keep memory bounded across long-running Streamlit sessions
+PREDICT_CACHE_TTL = 15 * 60
+PREDICT_CACHE_ENTRIES = 512
+BATCH_CACHE_TTL = 60 * 60
+BATCH_CACHE_ENTRIES = 8
+REPORT_CACHE_ENTRIES = 8
+
+# How long to wait for the API's background worker to render a PDF report
+REPORT_WAIT_SECONDS = 120
+REPORT_POLL_SECONDS = 0.5
+
+
+class APIError(Exception):
+    """Raised when the scoring API answers with an error status."""
+
+
+class ResultExpired(APIError):
+    """The API no longer holds the batch result behind a result id (evicted or restarted)."""
+
+
+@st.cache_resource
+def get_session():
+    """
+    One keep-alive session shared by every rerun and every browser tab.
+    Connections to the API are pooled instead of re-opened per click.
+    """
+    session = requests.Session()
+    retry = Retry(total=2, connect=2, read=0, backoff_factor=0.2,
+                  allowed_methods=None, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def _json_or_raise(response):
+    try:
+        result = response.json()
+    except ValueError:
+        result = {}
+    if response.status_code >= 300:
+        message = result.get('error', f"HTTP {response.status_code}")
+        # 429 = server is shedding load; tell the user when to try again
+        if response.status_code == 429 and 'Retry-After' in response.headers:
+            message += f" - retry in {response.headers['Retry-After']}s"
+        raise APIError(message)
+    return result
+
+
+def file_digest(content: bytes) -> str:
+    """Content hash used as the batch cache key (same file => same result)."""
+    return hashlib.sha256(content).hexdigest()
+
+
+@st.cache_data(ttl=PREDICT_CACHE_TTL, max_entries=PREDICT_CACHE_ENTRIES, show_spinner=False)
+def predict_single(payload: dict):
+    """
+    POST one customer to /predict.
+    Cached per input payload; errors raise and are therefore never cached.
+    """
+    response = get_session().post(f"{API_URL}/predict", json=payload, timeout=PREDICT_TIMEOUT)
+    return _json_or_raise(response)
+
+
+@st.cache_data(ttl=BATCH_CACHE_TTL, max_entries=BATCH_CACHE_ENTRIES, show_spinner=False)
+def batch_predict(digest: str, filename: str, _content: bytes):
+    """
+    POST a CSV to /batch-predict as a gzip-compressed upload.
+    Cached per file content hash (`digest`); the raw bytes are excluded
+    from Streamlit's hashing via the leading underscore.
+    """
+    compressed = gzip.compress(_content, compresslevel=5)
+    response = get_session().post(
+        f"{API_URL}/batch-predict",
+        files={"file": (f"{filename}.gz", compressed, "application/gzip")},
+        timeout=BATCH_TIMEOUT
+    )
+    return _json_or_raise(response)
+
+
+@st.cache_data(ttl=BATCH_CACHE_TTL, max_entries=REPORT_CACHE_ENTRIES, show_spinner=False)
+def fetch_report(result_id: str):
+    """
+    Ask the API to build the PDF report for a batch result, wait for its
+    background worker and return the PDF bytes. Cached per result id.
+    """
+    session = get_session()
+    response = session.post(f"{API_URL}/reports/{result_id}", timeout=PREDICT_TIMEOUT)
+    if response.status_code == 404:
+        # Cached batch results outlive the API's summaries: drop them so the next
+        # batch_predict call scores the file again and gets a result id the API knows
+        batch_predict.clear()
+        raise ResultExpired("The API no longer has this batch result (restarted or evicted)")
+    job = _json_or_raise(response)
+
+    deadline = time.monotonic() + REPORT_WAIT_SECONDS
+    while job["status"] in ("queued", "running"):
+        if time.monotonic() > deadline:
+            raise APIError("Timed out waiting for the PDF report")
+        time.sleep(REPORT_POLL_SECONDS)
+        job = _json_or_raise(session.get(f"{API_URL}/reports/{result_id}", timeout=PREDICT_TIMEOUT))
+
+    if job["status"] != "done":
+        raise APIError(job.get("error", f"Report {job['status']}"))
+
+    response = session.get(f"{API_URL}/reports/{result_id}/pdf", timeout=BATCH_TIMEOUT)
+    if response.status_code != 200:
+        _json_or_raise(response)
+    return response.content
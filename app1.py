@@ -1,9 +1,10 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
 import urllib.parse
 
+from api_client import APIError, ResultExpired, predict_single, batch_predict, file_digest, fetch_report
+
 # ========== Streamlit Page Config ==========
 st.set_page_config(
     page_title="ChurnAI - Customer Prediction Platform",
@@ -42,7 +43,14 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-api_url = "http://127.0.0.1:8000"
+def run_batch(uploaded_file):
+    """Score the uploaded CSV through the API and keep the results in the session."""
+    content = uploaded_file.getvalue()
+    result = batch_predict(file_digest(content), uploaded_file.name, content)
+    st.session_state.batch_results = result["results"]
+    st.session_state.batch_result_id = result.get("result_id")
+    st.session_state.report_pdf = None
+
 
 def get_recommendation(risk_level):
     recommendations = {
@@ -206,71 +214,69 @@ if st.session_state.active_section == 'single':
                 "totalcharges": totalcharges
             }
             try:
-                response = requests.post(f"{api_url}/predict", json=payload)
-                result = response.json()
-                if response.status_code == 200:
-                    churn_class = "churn" if result['prediction'] == 1 else ""
-                    prediction_text = "⚠️ HIGH CHURN RISK" if result['prediction'] == 1 else "✅ CUSTOMER RETAINED"
-                    probability = result['probability'] * 100
-                    st.markdown(f"""
-                        <div class="prediction-result {churn_class}">
-                            <h1>{prediction_text}</h1>
-                            <div class="metric-value">{probability:.1f}%</div>
-                            <div class="metric-label">Churn Probability Score</div>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    if probability > 70:
-                        risk_level = "🔴 CRITICAL RISK"
-                        risk_color = "linear-gradient(135deg, #e53e3e 0%, #c53030 100%)"
-                    elif probability > 40:
-                        risk_level = "🟡 MODERATE RISK"
-                        risk_color = "linear-gradient(135deg, #ed8936 0%, #dd6b20 100%)"
-                    else:
-                        risk_level = "🟢 LOW RISK"
-                        risk_color = "linear-gradient(135deg, #48bb78 0%, #38a169 100%)"
-                    st.markdown(f"""
-                        <div style="background: {risk_color}; color: white; padding: 1.5rem; 
-                                   border-radius: 15px; text-align: center; margin: 1.5rem 0;
-                                   box-shadow: 0 15px 35px rgba(0,0,0,0.3); font-size: 1.3rem; font-weight: 600;">
-                            Risk Assessment: {risk_level}
-                        </div>
-                    """, unsafe_allow_html=True)
-                    if 'shap' in result:
-                        st.markdown('<div class="shap-section">', unsafe_allow_html=True)
-                        st.markdown("### 🔬 AI Model Explainability (SHAP Analysis)")
-                        shap_df = pd.DataFrame(result['shap'].items(), columns=["Feature", "Impact"])
-                        shap_df = shap_df.sort_values(by="Impact", key=lambda x: x.abs(), ascending=False)
-                        st.markdown("#### 🎯 Key Decision Factors")
-                        for i, row in shap_df.head(5).iterrows():
-                            direction = "increases" if row['Impact'] > 0 else "reduces"
-                            icon = "📈" if row['Impact'] > 0 else "📉"
-                            st.markdown(f"""
-                                <div class="feature-impact">
-                                    {icon} <strong>{row['Feature']}</strong> {direction} churn probability by <strong>{abs(row['Impact']):.3f}</strong>
-                                </div>
-                            """, unsafe_allow_html=True)
-                        fig = px.bar(
-                            shap_df.head(8),
-                            x='Impact',
-                            y='Feature',
-                            orientation='h',
-                            color='Impact',
-                            color_continuous_scale=['#ed8936', '#2d3748', '#48bb78'],
-                            title="🔍 Feature Impact Analysis"
-                        )
-                        fig.update_layout(
-                            height=400,
-                            showlegend=False,
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            paper_bgcolor='rgba(0,0,0,0)',
-                            font=dict(color='#e2e8f0'),
-                            title_font_color='#f7fafc'
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-                        st.markdown('</div>', unsafe_allow_html=True)
-                        st.success("✨ Analysis complete! SHAP explainability displayed below.")
+                result = predict_single(payload)
+                churn_class = "churn" if result['prediction'] == 1 else ""
+                prediction_text = "⚠️ HIGH CHURN RISK" if result['prediction'] == 1 else "✅ CUSTOMER RETAINED"
+                probability = result['probability'] * 100
+                st.markdown(f"""
+                    <div class="prediction-result {churn_class}">
+                        <h1>{prediction_text}</h1>
+                        <div class="metric-value">{probability:.1f}%</div>
+                        <div class="metric-label">Churn Probability Score</div>
+                    </div>
+                """, unsafe_allow_html=True)
+                if probability > 70:
+                    risk_level = "🔴 CRITICAL RISK"
+                    risk_color = "linear-gradient(135deg, #e53e3e 0%, #c53030 100%)"
+                elif probability > 40:
+                    risk_level = "🟡 MODERATE RISK"
+                    risk_color = "linear-gradient(135deg, #ed8936 0%, #dd6b20 100%)"
                 else:
-                    st.error(f"❌ Prediction Error: {result.get('error', 'Unknown error occurred')}")
+                    risk_level = "🟢 LOW RISK"
+                    risk_color = "linear-gradient(135deg, #48bb78 0%, #38a169 100%)"
+                st.markdown(f"""
+                    <div style="background: {risk_color}; color: white; padding: 1.5rem; 
+                               border-radius: 15px; text-align: center; margin: 1.5rem 0;
+                               box-shadow: 0 15px 35px rgba(0,0,0,0.3); font-size: 1.3rem; font-weight: 600;">
+                        Risk Assessment: {risk_level}
+                    </div>
+                """, unsafe_allow_html=True)
+                if 'shap' in result:
+                    st.markdown('<div class="shap-section">', unsafe_allow_html=True)
+                    st.markdown("### 🔬 AI Model Explainability (SHAP Analysis)")
+                    shap_df = pd.DataFrame(result['shap'].items(), columns=["Feature", "Impact"])
+                    shap_df = shap_df.sort_values(by="Impact", key=lambda x: x.abs(), ascending=False)
+                    st.markdown("#### 🎯 Key Decision Factors")
+                    for i, row in shap_df.head(5).iterrows():
+                        direction = "increases" if row['Impact'] > 0 else "reduces"
+                        icon = "📈" if row['Impact'] > 0 else "📉"
+                        st.markdown(f"""
+                            <div class="feature-impact">
+                                {icon} <strong>{row['Feature']}</strong> {direction} churn probability by <strong>{abs(row['Impact']):.3f}</strong>
+                            </div>
+                        """, unsafe_allow_html=True)
+                    fig = px.bar(
+                        shap_df.head(8),
+                        x='Impact',
+                        y='Feature',
+                        orientation='h',
+                        color='Impact',
+                        color_continuous_scale=['#ed8936', '#2d3748', '#48bb78'],
+                        title="🔍 Feature Impact Analysis"
+                    )
+                    fig.update_layout(
+                        height=400,
+                        showlegend=False,
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='#e2e8f0'),
+                        title_font_color='#f7fafc'
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    st.success("✨ Analysis complete! SHAP explainability displayed below.")
+            except APIError as e:
+                st.error(f"❌ Prediction Error: {e}")
             except Exception as e:
                 st.error(f"🔌 Connection Error: {str(e)}")
 
@@ -296,25 +302,21 @@ if st.session_state.active_section == 'batch':
     if uploaded_file and not st.session_state.analysis_complete:
         st.success(f"✅ Dataset loaded: {uploaded_file.name}")
         try:
-            preview_df = pd.read_csv(uploaded_file)
+            # Only the first rows are needed for the preview - don't parse the whole file on every rerun
+            uploaded_file.seek(0)
+            preview_df = pd.read_csv(uploaded_file, nrows=8)
+            uploaded_file.seek(0)
             st.markdown("#### 👀 Dataset Preview")
-            st.dataframe(preview_df.head(8), use_container_width=True)
+            st.dataframe(preview_df, use_container_width=True)
             if st.button("🚀 Execute Batch Analysis", key="batch_analyze"):
                 with st.spinner("⚡ Processing batch predictions with AI..."):
                     try:
-                        uploaded_file.seek(0)
-                        response = requests.post(
-                            f"{api_url}/batch-predict", 
-                            files={"file": (uploaded_file.name, uploaded_file.getvalue())}
-                        )
-                        result = response.json()
-                        if response.status_code == 200:
-                            st.session_state.batch_results = result["results"]
-                            st.session_state.analysis_complete = True
-                            st.session_state.uploaded_filename = uploaded_file.name
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Analysis Failed: {result.get('error', 'Unknown error')}")
+                        run_batch(uploaded_file)
+                        st.session_state.analysis_complete = True
+                        st.session_state.uploaded_filename = uploaded_file.name
+                        st.rerun()
+                    except APIError as e:
+                        st.error(f"❌ Analysis Failed: {e}")
                     except Exception as e:
                         st.error(f"🔌 Processing Error: {str(e)}")
         except Exception as e:
@@ -372,6 +374,35 @@ if st.session_state.active_section == 'batch':
         # Action buttons below result
         st.markdown("---")
         col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            if st.session_state.get('batch_result_id'):
+                if st.button("📄 Generate PDF Report", key="pdf_report_btn"):
+                    with st.spinner("🖨️ Rendering PDF report..."):
+                        try:
+                            try:
+                                pdf = fetch_report(st.session_state.batch_result_id)
+                            except ResultExpired:
+                                # The batch cache was cleared - score the file again for a fresh result id
+                                if not uploaded_file:
+                                    raise
+                                st.info("🔄 The server no longer has this batch result - re-scoring the file first...")
+                                run_batch(uploaded_file)
+                                pdf = fetch_report(st.session_state.batch_result_id)
+                            st.session_state.report_pdf = pdf
+                        except ResultExpired as e:
+                            st.warning(f"⚠️ {e}. Upload the file and run the analysis again to get a report.")
+                        except APIError as e:
+                            st.error(f"❌ Report Failed: {e}")
+                        except Exception as e:
+                            st.error(f"🔌 Report Error: {str(e)}")
+                if st.session_state.get('report_pdf'):
+                    st.download_button(
+                        "📥 Download PDF Report",
+                        data=st.session_state.report_pdf,
+                        file_name=f"churn_report_{st.session_state.batch_result_id}.pdf",
+                        mime="application/pdf",
+                        key="download_pdf_report"
+                    )
         with col2:
             csv_data = df.to_csv(index=False)
             timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
@@ -0,0 +1,81 @@
+# utils/batch_summary.py
+"""
+Fixed-size aggregates of a scored batch.
+
+Batch workers fold every scored chunk into a BatchSummary; the API keeps its
+dict form under a result id and the report worker renders PDFs from it. Kept
+free of plotting imports so batch workers never load matplotlib.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+# Same thresholds and labels as the Streamlit dashboard
+RISK_LEVELS = ['High Risk', 'Medium Risk', 'Low Risk']
+HIGH_RISK_THRESHOLD = 0.7
+MEDIUM_RISK_THRESHOLD = 0.4
+HISTOGRAM_BINS = 25
+TOP_DRIVERS = 10
+
+
+class BatchSummary:
+    """Aggregated view of one batch result; updated chunk by chunk, memory independent of row count."""
+
+    def __init__(self):
+        self.total = 0
+        self.churned = 0
+        self.probability_sum = 0.0
+        self.risk_counts = np.zeros(len(RISK_LEVELS), dtype=np.int64)
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.feature_names = None
+        self.shap_abs_sum = None
+        self.shap_sum = None
+
+    def update(self, predictions, probabilities, shap_values=None, feature_names=None):
+        probabilities = np.asarray(probabilities, dtype=float)
+        self.total += len(probabilities)
+        self.churned += int(np.sum(predictions))
+        self.probability_sum += float(probabilities.sum())
+
+        high = probabilities > HIGH_RISK_THRESHOLD
+        medium = (probabilities > MEDIUM_RISK_THRESHOLD) & ~high
+        self.risk_counts += [int(high.sum()), int(medium.sum()), int((~high & ~medium).sum())]
+        self.histogram += np.histogram(probabilities, bins=HISTOGRAM_BINS, range=(0, 1))[0]
+
+        if shap_values is not None:
+            shap_values = np.asarray(shap_values, dtype=float)
+            if self.shap_sum is None:
+                self.feature_names = [str(name) for name in feature_names]
+                self.shap_sum = np.zeros(shap_values.shape[1])
+                self.shap_abs_sum = np.zeros(shap_values.shape[1])
+            self.shap_sum += shap_values.sum(axis=0)
+            self.shap_abs_sum += np.abs(shap_values).sum(axis=0)
+
+    def to_dict(self):
+        total = max(self.total, 1)
+        summary = {
+            "total_customers": self.total,
+            "churned": self.churned,
+            "churn_rate": self.churned / total * 100,
+            "avg_probability": self.probability_sum / total * 100,
+            "risk_distribution": dict(zip(RISK_LEVELS, self.risk_counts.tolist())),
+            "probability_histogram": self.histogram.tolist(),
+            "drivers": []
+        }
+        if self.shap_sum is not None:
+            order = np.argsort(-self.shap_abs_sum)[:TOP_DRIVERS]
+            summary["drivers"] = [
+                {
+                    "feature": self.feature_names[i],
+                    "mean_abs_impact": float(self.shap_abs_sum[i] / total),
+                    "mean_impact": float(self.shap_sum[i] / total)
+                }
+                for i in order
+            ]
+        return summary
+
+
+def result_hash(summary: dict):
+    return hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()[:16]
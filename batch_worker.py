@@ -0,0 +1,130 @@
+# utils/batch_worker.py
+"""
+Batch scoring in separate, low-priority worker processes.
+
+/batch-predict hands the spooled upload to a process pool so CSV parsing,
+preprocessing, SHAP and JSON encoding never hold the API process's GIL, and
+the workers run at a lower CPU priority so the OS schedules interactive
+/predict work first. Workers return the encoded response body plus small
+aggregates (report summary, drift counts) for the API process to keep.
+"""
+
+import gzip
+import json
+
+import joblib
+import pandas as pd
+
+from utils.admission import Overloaded
+from utils.batch_summary import BatchSummary, result_hash
+from utils.drift_monitor import DriftMonitor, load_baseline
+from utils.predict import make_batch_prediction
+from utils.preprocess import preprocess_for_scoring
+
+BATCH_CHUNK_ROWS = 5000
+# Added to the worker's nice value; interactive requests in the API process keep priority.
+# The pool applies it with os.nice as initializer, i.e. before this module (shap, pandas)
+# is imported and the models are loaded, so no worker step runs at full priority.
+WORKER_NICENESS = 10
+
+# Loaded on first use and kept for the lifetime of the worker process
+_models = {}
+_drift_baselines = {}
+
+
+def _load_model(path):
+    if path not in _models:
+        _models[path] = joblib.load(path)
+    return _models[path]
+
+
+def _load_baseline(path):
+    if path not in _drift_baselines:
+        _drift_baselines[path] = load_baseline(path)
+    return _drift_baselines[path]
+
+
+class CappedReader:
+    """File wrapper that stops reading (413) once more than `limit` bytes were produced - guards gzip bombs."""
+
+    def __init__(self, raw, limit):
+        self.raw = raw
+        self.limit = limit
+        self.bytes_read = 0
+
+    def _count(self, data):
+        self.bytes_read += len(data)
+        if self.bytes_read > self.limit:
+            raise Overloaded(
+                f"Upload expands to more than the {self.limit / 2**20:.0f} MiB it was admitted for",
+                status_code=413
+            )
+        return data
+
+    def read(self, size=-1):
+        return self._count(self.raw.read(size))
+
+    def readline(self, size=-1):
+        return self._count(self.raw.readline(size))
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+def score_batch(model_path, tier, path, compression, byte_limit, model_version, drift_baseline_path=None):
+    """
+    Score one uploaded CSV.
+    :param byte_limit: Maximum uncompressed bytes the request was admitted for
+    :param drift_baseline_path: Baseline for the returned drift counts (None: no drift monitoring)
+    :return: (JSON response body, report summary, drift monitor or None)
+    """
+    model = _load_model(model_path)
+    opener = gzip.open if compression == "gzip" else open
+    with opener(path, "rb") as raw:
+        df = pd.read_csv(CappedReader(raw, byte_limit))
+
+    X = preprocess_for_scoring(df)
+    del df
+
+    monitor = None
+    if drift_baseline_path:
+        monitor = DriftMonitor(_load_baseline(drift_baseline_path), model_version)
+    if tier == "accurate":
+        import shap
+        explainer = shap.TreeExplainer(model)
+
+    result_data = []
+    summary = BatchSummary()
+    for start in range(0, len(X), BATCH_CHUNK_ROWS):
+        chunk = X.iloc[start:start + BATCH_CHUNK_ROWS]
+        predictions, probabilities = make_batch_prediction(model, chunk)
+
+        # The probability baseline belongs to the accurate model
+        if monitor is not None:
+            monitor.update(chunk, probabilities if tier == "accurate" else None)
+
+        if tier != "accurate":
+            summary.update(predictions, probabilities)
+            result_data.extend(
+                {"prediction": int(pred), "probability": float(round(prob, 4)), "tier": tier}
+                for pred, prob in zip(predictions, probabilities)
+            )
+            continue
+
+        # Convert SHAP values into a list of dictionaries for each row
+        shap_values = explainer.shap_values(chunk)
+        summary.update(predictions, probabilities, shap_values, chunk.columns)
+        shap_dict_list = pd.DataFrame(shap_values, columns=chunk.columns).to_dict(orient="records")
+        result_data.extend(
+            {
+                "prediction": int(pred),
+                "probability": float(round(prob, 4)),
+                "shap": {str(k): float(v) for k, v in shap_dict.items()}
+            }
+            for pred, prob, shap_dict in zip(predictions, probabilities, shap_dict_list)
+        )
+
+    summary = summary.to_dict()
+    # result_id identifies this batch for /reports
+    body = json.dumps({"results": result_data, "result_id": result_hash(summary)}).encode()
+    return body, summary, monitor
@@ -0,0 +1,243 @@
+# utils/data_pipeline.py
+"""
+Out-of-core version of data_engineering.ipynb.
+
+Raw exports are read in partitions (CSV chunks) and run through the same
+ChurnPredictionModel steps used by the API, in two passes:
+
+  1. statistics  - per-partition column summaries are merged into global
+                   medians (exact for low-cardinality columns, approximate
+                   quantile sketch otherwise) and modes
+  2. transform   - every partition is preprocessed with those global fill
+                   values and written as one Parquet file of the dataset
+
+Usage:
+    python -m utils.data_pipeline data/Customer_Data*.csv --out data/cleaned_churn_data
+"""
+
+import argparse
+import math
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocess import ChurnPredictionModel, FEATURE_NAME_MAP
+
+DEFAULT_CHUNKSIZE = 250_000
+
+# Columns with more distinct values than this only keep the quantile sketch
+MAX_EXACT_VALUES = 2048
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch for non-negative values (DDSketch-style
+    logarithmic buckets). Memory grows with log(max/min), not with row count,
+    and two sketches merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = 1e-9
+        self.zero_count = 0
+        self.count = 0
+        self.bins = Counter()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values) & (values >= 0)]
+        if values.size == 0:
+            return
+        zeros = values < self.min_value
+        self.zero_count += int(zeros.sum())
+        self.count += int(values.size)
+        keys = np.ceil(np.log(values[~zeros]) / self.log_gamma).astype(np.int64)
+        for key, n in zip(*np.unique(keys, return_counts=True)):
+            self.bins[int(key)] += int(n)
+
+    def merge(self, other):
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.bins.update(other.bins)
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class ColumnStats:
+    """Mergeable summary of one column: exact value counts while small, plus a quantile sketch."""
+
+    def __init__(self):
+        self.sketch = QuantileSketch()
+        self.counts = Counter()
+
+    def update(self, series):
+        values = series.dropna()
+        self.sketch.update(values.to_numpy())
+        if self.counts is not None:
+            self.counts.update(values.value_counts().to_dict())
+            self._check_size()
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        if self.counts is not None and other.counts is not None:
+            self.counts.update(other.counts)
+            self._check_size()
+        else:
+            self.counts = None
+        return self
+
+    def _check_size(self):
+        if len(self.counts) > MAX_EXACT_VALUES:
+            self.counts = None
+
+    def median(self):
+        if self.counts is None:
+            return self.sketch.quantile(0.5)
+        n = sum(self.counts.values())
+        if n == 0:
+            return np.nan
+        # Same definition as pandas: mean of the two middle values
+        lo_rank, hi_rank = (n - 1) // 2, n // 2
+        lo = hi = None
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if lo is None and seen > lo_rank:
+                lo = value
+            if seen > hi_rank:
+                hi = value
+                break
+        return (lo + hi) / 2
+
+    def mode(self):
+        if not self.counts:
+            return np.nan
+        return max(sorted(self.counts), key=self.counts.get)
+
+
+def _prepare_partition(df, processor):
+    """Steps of data_engineering.ipynb that run before load_and_preprocess_data."""
+    df = processor._clean_column_names(df)
+    df = processor.standardize_features(df, FEATURE_NAME_MAP)
+    if 'churn' in df.columns:
+        df = processor._clean_churn_values(df)
+    processor.setup_preprocessing(df)
+    return df
+
+
+def partition_stats(df):
+    """Pass 1: column summaries for one partition."""
+    processor = ChurnPredictionModel()
+    # Keep contract gaps in place so only observed values are counted
+    processor.fill_values = {'contract': np.nan}
+    df = _prepare_partition(df, processor)
+
+    stats = {}
+    for col in df.select_dtypes(include=['int64', 'float64']).columns:
+        stats[col] = ColumnStats()
+        stats[col].update(df[col].where(df[col] >= 0))
+    if 'totalcharges' in df.columns and 'totalcharges' not in stats:
+        stats['totalcharges'] = ColumnStats()
+        stats['totalcharges'].update(pd.to_numeric(df['totalcharges'], errors='coerce'))
+    return stats
+
+
+def transform_partition(df, fill_values, out_path):
+    """Pass 2: preprocess one partition with global fill values and write it as Parquet."""
+    processor = ChurnPredictionModel()
+    processor.fill_values = fill_values
+    df = _prepare_partition(df, processor)
+    df = processor.load_and_preprocess_data(df)
+    df.to_parquet(out_path, index=False)
+    return len(df)
+
+
+def compute_fill_values(stats):
+    fill_values = {col: col_stats.median() for col, col_stats in stats.items()}
+    if 'contract' in stats:
+        contract_mode = stats['contract'].mode()
+        fill_values['contract'] = 0 if pd.isna(contract_mode) else contract_mode
+    return {col: value for col, value in fill_values.items() if not pd.isna(value)}
+
+
+def _iter_partitions(paths, chunksize):
+    for path in paths:
+        yield from pd.read_csv(path, chunksize=chunksize, low_memory=False)
+
+
+def _map_bounded(executor, fn, iterable, max_in_flight):
+    """executor.map that only keeps `max_in_flight` partitions in memory at a time."""
+    pending = deque()
+    for args in iterable:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_pipeline(paths, out_dir, chunksize=DEFAULT_CHUNKSIZE, workers=None):
+    workers = workers or os.cpu_count() or 1
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old_part in out_dir.glob("part-*.parquet"):
+        old_part.unlink()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Pass 1: global statistics
+        stats = {}
+        partitions = ((df,) for df in _iter_partitions(paths, chunksize))
+        for part_stats in _map_bounded(executor, partition_stats, partitions, workers * 2):
+            for col, col_stats in part_stats.items():
+                if col in stats:
+                    stats[col].merge(col_stats)
+                else:
+                    stats[col] = col_stats
+        fill_values = compute_fill_values(stats)
+        print(f"📐 Global fill values: {fill_values}")
+
+        # Pass 2: transform and write
+        partitions = (
+            (df, fill_values, out_dir / f"part-{i:05d}.parquet")
+            for i, df in enumerate(_iter_partitions(paths, chunksize))
+        )
+        total_rows = 0
+        n_parts = 0
+        for n_rows in _map_bounded(executor, transform_partition, partitions, workers * 2):
+            total_rows += n_rows
+            n_parts += 1
+
+    print(f"✅ Wrote {total_rows:,} rows in {n_parts} partitions to {out_dir}")
+    return fill_values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the churn training set out of core")
+    parser.add_argument("inputs", nargs="+", help="Raw CSV export(s)")
+    parser.add_argument("--out", default="data/cleaned_churn_data", help="Output Parquet dataset directory")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per partition")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    run_pipeline(args.inputs, args.out, chunksize=args.chunksize, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
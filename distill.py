@@ -0,0 +1,134 @@
+# utils/distill.py
+"""
+Low-latency ("fast" tier) churn model distilled from the best model picked by ModelTrainer.
+
+A shallow gradient-boosted regressor is fitted to the teacher's churn log-odds.
+After fitting, the trees are flattened into numpy arrays so scoring a row is a
+handful of array lookups instead of a pass through sklearn's validation layers.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+
+PROBA_CLIP = 1e-4
+
+
+class DistilledChurnModel:
+    def __init__(self, n_estimators=40, max_depth=2, learning_rate=0.2, threshold=0.5, random_state=42):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.learning_rate = learning_rate
+        self.threshold = threshold
+        self.random_state = random_state
+
+    def fit(self, X: pd.DataFrame, teacher_proba):
+        """
+        :param X: Training features
+        :param teacher_proba: Churn probabilities of the teacher model for X
+        """
+        p = np.clip(np.asarray(teacher_proba, dtype=float), PROBA_CLIP, 1 - PROBA_CLIP)
+        log_odds = np.log(p / (1 - p))
+
+        regressor = GradientBoostingRegressor(
+            n_estimators=self.n_estimators,
+            max_depth=self.max_depth,
+            learning_rate=self.learning_rate,
+            random_state=self.random_state
+        )
+        regressor.fit(X, log_odds)
+
+        self.feature_names_ = list(X.columns)
+        self._compile(regressor, X)
+        return self
+
+    def _compile(self, regressor, X):
+        trees = [est[0].tree_ for est in regressor.estimators_]
+        n_nodes = max(tree.node_count for tree in trees)
+
+        # Pad every tree to the same node count; padding is never reached
+        self.feature_ = np.zeros((len(trees), n_nodes), dtype=np.intp)
+        self.threshold_ = np.zeros((len(trees), n_nodes))
+        self.left_ = np.full((len(trees), n_nodes), -1, dtype=np.intp)
+        self.right_ = np.full((len(trees), n_nodes), -1, dtype=np.intp)
+        self.value_ = np.zeros((len(trees), n_nodes))
+        for i, tree in enumerate(trees):
+            n = tree.node_count
+            # Leaves have feature -2; any valid column works since they are never split on
+            self.feature_[i, :n] = np.maximum(tree.feature, 0)
+            self.threshold_[i, :n] = tree.threshold
+            self.left_[i, :n] = tree.children_left
+            self.right_[i, :n] = tree.children_right
+            self.value_[i, :n] = tree.value[:, 0, 0] * regressor.learning_rate
+
+        self.init_ = float(np.ravel(regressor.init_.predict(X.iloc[:1]))[0])
+        self.depth_ = max(tree.max_depth for tree in trees)
+        self._tree_idx = np.arange(len(trees))
+
+    def _log_odds(self, X):
+        if isinstance(X, pd.DataFrame):
+            if list(X.columns) != self.feature_names_:
+                X = X[self.feature_names_]
+            X = X.to_numpy(dtype=np.float32)
+        # sklearn compares float32 features against the split thresholds
+        X = np.asarray(X, dtype=np.float32)
+
+        rows = np.arange(len(X))[:, None]
+        node = np.zeros((len(X), len(self._tree_idx)), dtype=np.intp)
+        for _ in range(self.depth_):
+            go_left = X[rows, self.feature_[self._tree_idx, node]] <= self.threshold_[self._tree_idx, node]
+            child = np.where(go_left, self.left_[self._tree_idx, node], self.right_[self._tree_idx, node])
+            node = np.where(child == -1, node, child)
+        return self.init_ + self.value_[self._tree_idx, node].sum(axis=1)
+
+    def predict_proba(self, X):
+        p = 1 / (1 + np.exp(-self._log_odds(X)))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= self.threshold).astype(int)
+
+    def predict_row(self, features: dict):
+        """
+        Churn probability for one request given as {feature: value} in final
+        (int-coded) form. No DataFrame is built, which keeps a request well under a millisecond.
+        """
+        row = np.array([[features[name] for name in self.feature_names_]], dtype=np.float32)
+        return float(self.predict_proba(row)[0, 1])
+
+
+def measure_latency(model, X: pd.DataFrame, n_calls=200):
+    """
+    Time predict_proba on single rows (the real-time path) and on the whole frame.
+    :return: (p50 single-row latency in ms, p99 single-row latency in ms, batch cost per row in µs)
+    """
+    rows = [X.iloc[[i % len(X)]] for i in range(n_calls)]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch_seconds = time.perf_counter() - start
+
+    p50, p99 = np.percentile(timings, [50, 99]) * 1000
+    return float(p50), float(p99), batch_seconds / len(X) * 1e6
+
+
+def measure_end_to_end_latency(score, payloads):
+    """
+    Time a full per-request scoring path (preprocessing, model, explanation...) as the API runs it.
+    :param score: Callable taking one request payload ({feature: value})
+    :return: (p50 latency in ms, p99 latency in ms)
+    """
+    timings = []
+    for payload in payloads:
+        start = time.perf_counter()
+        score(payload)
+        timings.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(timings, [50, 99]) * 1000
+    return float(p50), float(p99)
@@ -0,0 +1,242 @@
+# utils/drift_monitor.py
+"""
+Streaming drift monitor for the 10 final model features and the churn probability.
+
+A baseline (bin edges + training counts) is captured once at training time with
+`build_baseline` / `save_baseline`. At serving time `DriftMonitor.update` adds each
+scored batch to fixed-size count arrays, so the cost per row is constant and the
+memory per model version is independent of traffic. Monitors from several workers
+can be combined with `merge`.
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_FEATURES = ['tenure', 'monthlycharges', 'totalcharges']
+CATEGORICAL_FEATURES = ['gender', 'seniorcitizen', 'partner', 'phoneservice',
+                        'onlineservice', 'streaming', 'contract']
+
+NUMERIC_BINS = 10
+PROBABILITY_EDGES = [round(0.1 * i, 1) for i in range(1, 10)]
+
+# Usual PSI reading: < 0.1 stable, 0.1 - 0.25 moderate shift, > 0.25 significant shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+EPSILON = 1e-4
+
+
+# ===== Baseline (training time) =====
+
+def build_baseline(X: pd.DataFrame, probabilities, bins=NUMERIC_BINS):
+    """
+    Summarise the training features and predicted probabilities.
+    :param X: Training features (the 10 final features)
+    :param probabilities: Model churn probabilities for X
+    :return: JSON-serialisable baseline dict
+    """
+    baseline = {"numeric": {}, "categorical": {}}
+
+    for col in NUMERIC_FEATURES:
+        if col not in X.columns:
+            continue
+        values = pd.to_numeric(X[col], errors='coerce').dropna().to_numpy()
+        # Interior quantile cut points -> roughly equal-mass training bins
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        baseline["numeric"][col] = {
+            "edges": edges.tolist(),
+            "counts": _bin_counts(values, edges).tolist()
+        }
+
+    for col in CATEGORICAL_FEATURES:
+        if col not in X.columns:
+            continue
+        counts = X[col].dropna().astype(int).value_counts().sort_index()
+        baseline["categorical"][col] = {
+            "values": counts.index.tolist(),
+            # Trailing slot collects categories never seen in training
+            "counts": counts.tolist() + [0]
+        }
+
+    baseline["probability"] = {
+        "edges": PROBABILITY_EDGES,
+        "counts": _bin_counts(np.asarray(probabilities, dtype=float), PROBABILITY_EDGES).tolist()
+    }
+    return baseline
+
+
+def save_baseline(baseline, path):
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# ===== Drift statistics =====
+
+def _bin_counts(values, edges):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    return np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+
+
+def psi(expected, actual):
+    """Population Stability Index between two count vectors over the same bins."""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    e = np.clip(expected / expected.sum(), EPSILON, None)
+    a = np.clip(actual / actual.sum(), EPSILON, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov distance computed on the binned CDFs (a lower bound of the exact statistic)."""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    return float(np.max(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum())))
+
+
+def _drift_level(value):
+    if value is None:
+        return "insufficient data"
+    if value >= PSI_SIGNIFICANT:
+        return "significant"
+    if value >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+# ===== Serving-time monitor =====
+
+class DriftMonitor:
+    def __init__(self, baseline, model_version="unknown"):
+        self.baseline = baseline
+        self.model_version = model_version
+        self._lock = threading.Lock()
+
+        self._numeric_edges = {col: np.asarray(spec["edges"], dtype=float)
+                               for col, spec in baseline["numeric"].items()}
+        self._category_values = {col: np.asarray(spec["values"], dtype=np.int64)
+                                 for col, spec in baseline["categorical"].items()}
+        self._probability_edges = np.asarray(baseline["probability"]["edges"], dtype=float)
+
+        self.reset()
+
+    def reset(self):
+        """Start a new monitoring window."""
+        with self._lock:
+            self.started_at = time.time()
+            self.rows_seen = 0
+            self.numeric_counts = {col: np.zeros(len(edges) + 1, dtype=np.int64)
+                                   for col, edges in self._numeric_edges.items()}
+            self.categorical_counts = {col: np.zeros(len(values) + 1, dtype=np.int64)
+                                       for col, values in self._category_values.items()}
+            self.probability_counts = np.zeros(len(self._probability_edges) + 1, dtype=np.int64)
+
+    def update(self, X, probabilities=None):
+        """
+        Add a scored batch to the sketches.
+        :param X: Preprocessed features - a DataFrame, or a {feature: value} dict for one row
+        :param probabilities: Churn probabilities; pass None to update the feature sketches only
+            (e.g. for a model tier other than the one the probability baseline was built from)
+        """
+        columns = {col: np.atleast_1d(np.asarray(X[col], dtype=float))
+                   for col in list(self._numeric_edges) + list(self._category_values) if col in X}
+        n_rows = len(X) if isinstance(X, pd.DataFrame) else max((len(v) for v in columns.values()), default=0)
+
+        numeric = {col: _bin_counts(columns[col], edges)
+                   for col, edges in self._numeric_edges.items() if col in columns}
+
+        categorical = {}
+        for col, values in self._category_values.items():
+            if col not in columns or len(values) == 0:
+                continue
+            codes = columns[col][~np.isnan(columns[col])].astype(np.int64)
+            # Position of each code in the (sorted) training categories; the last slot means unseen
+            slots = np.minimum(np.searchsorted(values, codes), len(values) - 1)
+            slots = np.where(values[slots] == codes, slots, len(values))
+            categorical[col] = np.bincount(slots, minlength=len(values) + 1)
+
+        probability = None
+        if probabilities is not None:
+            probability = _bin_counts(probabilities, self._probability_edges)
+
+        with self._lock:
+            for col, counts in numeric.items():
+                self.numeric_counts[col] += counts
+            for col, counts in categorical.items():
+                self.categorical_counts[col] += counts
+            if probability is not None:
+                self.probability_counts += probability
+            self.rows_seen += n_rows
+
+    def merge(self, other):
+        """Combine with a monitor of the same baseline (e.g. from another worker)."""
+        with self._lock:
+            for col, counts in other.numeric_counts.items():
+                self.numeric_counts[col] += counts
+            for col, counts in other.categorical_counts.items():
+                self.categorical_counts[col] += counts
+            self.probability_counts += other.probability_counts
+            self.rows_seen += other.rows_seen
+        return self
+
+    def __getstate__(self):
+        # Picklable so batch worker processes can send their counts back for merge()
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def report(self):
+        with self._lock:
+            numeric = {col: counts.copy() for col, counts in self.numeric_counts.items()}
+            categorical = {col: counts.copy() for col, counts in self.categorical_counts.items()}
+            probability = self.probability_counts.copy()
+            rows_seen = self.rows_seen
+
+        features = {}
+        for col, counts in numeric.items():
+            expected = self.baseline["numeric"][col]["counts"]
+            value = psi(expected, counts)
+            features[col] = {"psi": value, "ks": ks(expected, counts), "drift": _drift_level(value)}
+        for col, counts in categorical.items():
+            expected = self.baseline["categorical"][col]["counts"]
+            value = psi(expected, counts)
+            features[col] = {
+                "psi": value,
+                "drift": _drift_level(value),
+                "frequencies": {
+                    str(v): int(n) for v, n in zip(self.baseline["categorical"][col]["values"], counts)
+                },
+                "unseen": int(counts[-1])
+            }
+
+        expected = self.baseline["probability"]["counts"]
+        probability_psi = psi(expected, probability)
+        return {
+            "model_version": self.model_version,
+            "since": self.started_at,
+            "rows_seen": rows_seen,
+            "features": features,
+            "probability": {
+                "psi": probability_psi,
+                "ks": ks(expected, probability),
+                "drift": _drift_level(probability_psi),
+                "edges": self.baseline["probability"]["edges"],
+                "counts": probability.tolist()
+            }
+        }
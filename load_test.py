@@ -0,0 +1,138 @@
+# load_test.py
+"""
+Local load test for the scoring API admission control.
+
+Phase 1 measures /predict latency on its own. Phase 2 repeats it while several
+clients keep uploading large CSVs to /batch-predict. With admission control the
+interactive p99 should stay close to phase 1 while excess batch uploads get 429.
+
+Usage (API running on 127.0.0.1:8000):
+    python load_test.py --duration 30 --batch-clients 6 --batch-rows 200000
+"""
+
+import argparse
+import io
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import requests
+
+PAYLOAD = {
+    "gender": 1, "seniorcitizen": 0, "partner": 1, "tenure": 12.0,
+    "phoneservice": 1, "onlineservice": 0, "streaming": 1, "contract": 0,
+    "monthlycharges": 70.5, "totalcharges": 846.0
+}
+# Pause after connection errors instead of hammering a server that is down
+ERROR_BACKOFF_SECONDS = 1.0
+
+
+def make_batch_csv(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    yes_no = lambda: rng.choice(["Yes", "No"], rows)
+    df = pd.DataFrame({
+        "customerID": [f"C{i:08d}" for i in range(rows)],
+        "gender": rng.choice(["Male", "Female"], rows),
+        "SeniorCitizen": rng.integers(0, 2, rows),
+        "Partner": yes_no(),
+        "tenure": rng.integers(0, 72, rows),
+        "PhoneService": yes_no(),
+        "InternetService": rng.choice(["DSL", "Fiber optic", "No"], rows),
+        "OnlineSecurity": yes_no(),
+        "StreamingTV": yes_no(),
+        "Contract": rng.choice(["Month-to-month", "One year", "Two year"], rows),
+        "MonthlyCharges": rng.uniform(18, 120, rows).round(2),
+        "TotalCharges": rng.uniform(18, 8000, rows).round(2),
+    })
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def interactive_client(url, stop, latencies, statuses, tier):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/predict", params={"tier": tier}, json=PAYLOAD, timeout=30)
+        except requests.RequestException:
+            statuses["error"] += 1
+            stop.wait(ERROR_BACKOFF_SECONDS)
+            continue
+        statuses[response.status_code] += 1
+        # Only served requests count - a fast 429 would flatter the percentiles
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        elif response.status_code == 429:
+            stop.wait(min(float(response.headers.get("Retry-After", 1)), 5))
+
+
+def batch_client(url, stop, csv_bytes, statuses):
+    while not stop.is_set():
+        try:
+            # New connection per upload: after a Retry-After pause a pooled one may already
+            # be closed by the server's keep-alive timeout, and POSTs are not retried
+            response = requests.post(f"{url}/batch-predict",
+                                     files={"file": ("load_test.csv", csv_bytes)}, timeout=600)
+            statuses[response.status_code] += 1
+            if response.status_code == 429:
+                stop.wait(min(float(response.headers.get("Retry-After", 1)), 5))
+        except requests.RequestException:
+            statuses["error"] += 1
+            stop.wait(ERROR_BACKOFF_SECONDS)
+
+
+def run_phase(name, url, duration, interactive_clients, batch_clients, csv_bytes, tier):
+    stop = threading.Event()
+    latencies, interactive_statuses, batch_statuses = [], Counter(), Counter()
+    threads = [
+        threading.Thread(target=interactive_client, args=(url, stop, latencies, interactive_statuses, tier))
+        for _ in range(interactive_clients)
+    ] + [
+        threading.Thread(target=batch_client, args=(url, stop, csv_bytes, batch_statuses))
+        for _ in range(batch_clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"\n📊 {name}")
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"  /predict       n={len(latencies):,}  p50={p50:.1f} ms  p95={p95:.1f} ms  p99={p99:.1f} ms")
+    print(f"  /predict       statuses={dict(interactive_statuses)}")
+    if batch_clients:
+        print(f"  /batch-predict statuses={dict(batch_statuses)}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interactive latency under batch load")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per phase")
+    parser.add_argument("--interactive-clients", type=int, default=4)
+    parser.add_argument("--batch-clients", type=int, default=6)
+    parser.add_argument("--batch-rows", type=int, default=200_000)
+    parser.add_argument("--tier", default="accurate", help="Model tier for /predict")
+    args = parser.parse_args()
+
+    print(f"🧪 Building a {args.batch_rows:,}-row batch file...")
+    csv_bytes = make_batch_csv(args.batch_rows)
+    print(f"   {len(csv_bytes) / 2**20:.1f} MiB")
+
+    run_phase("Phase 1: interactive only", args.url, args.duration,
+              args.interactive_clients, 0, csv_bytes, args.tier)
+    run_phase("Phase 2: interactive + saturating batch", args.url, args.duration,
+              args.interactive_clients, args.batch_clients, csv_bytes, args.tier)
+
+    stats = requests.get(f"{args.url}/admission", timeout=10).json()
+    print(f"\n🚦 Admission stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,91 @@
 from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pydantic import BaseModel
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import pandas as pd
 import joblib
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
 import traceback
 
-from utils.predict import make_single_prediction, make_batch_prediction
+from utils.predict import make_single_prediction
 from utils.shap_explainer import get_shap_values
-from utils.report_generator import generate_pdf_report
-from utils.preprocess import ChurnPredictionModel, FEATURE_NAME_MAP
+from utils.report_generator import ReportService
+from utils.preprocess import preprocess_for_scoring
+from utils.drift_monitor import DriftMonitor, load_baseline
+from utils.admission import AdmissionController, Overloaded, estimate_batch_bytes, gzip_uncompressed_size
+from utils import batch_worker
 
 app = FastAPI(title="Customer Churn Prediction API")
 
 # Load model once at startup
-trained_model = joblib.load("model/best_churn_model.pkl")
+MODEL_PATH = "model/best_churn_model.pkl"
+FAST_MODEL_PATH = "model/fast_churn_model.pkl"
+DRIFT_BASELINE_PATH = "model/drift_baseline.json"
+
+trained_model = joblib.load(MODEL_PATH)
+with open(MODEL_PATH, "rb") as f:
+    MODEL_VERSION = hashlib.sha256(f.read()).hexdigest()[:12]
+
+# Drift monitoring is only enabled when the training run saved a baseline
+drift_monitor = None
+if os.path.exists(DRIFT_BASELINE_PATH):
+    drift_monitor = DriftMonitor(load_baseline(DRIFT_BASELINE_PATH), model_version=MODEL_VERSION)
+
+# Model tiers selectable per request: "accurate" is the best model by F1, "fast" the
+# distilled low-latency model from new_model.ipynb (no SHAP explanations)
+MODEL_TIERS = {"accurate": trained_model}
+MODEL_TIER_PATHS = {"accurate": MODEL_PATH}
+if os.path.exists(FAST_MODEL_PATH):
+    MODEL_TIERS["fast"] = joblib.load(FAST_MODEL_PATH)
+    MODEL_TIER_PATHS["fast"] = FAST_MODEL_PATH
+
+
+# Separate limits for interactive and batch traffic; batch work also reserves memory
+admission = AdmissionController(
+    max_interactive=int(os.getenv("MAX_INTERACTIVE_REQUESTS", 32)),
+    max_batch=int(os.getenv("MAX_BATCH_REQUESTS", 2)),
+    memory_budget=int(os.getenv("BATCH_MEMORY_BUDGET_BYTES", 0)) or None
+)
+
+# Batch scoring runs in separate low-priority processes, one per batch slot, so it
+# never holds this process's GIL while /predict is serving requests
+def new_batch_pool():
+    return ProcessPoolExecutor(
+        max_workers=admission.max_batch,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=os.nice,
+        initargs=(batch_worker.WORKER_NICENESS,)
+    )
+
+
+batch_pool = new_batch_pool()
+# Seconds a client should wait after a batch worker died (the new pool has to start up)
+BATCH_WORKER_RESTART_SECONDS = 5
+
+# PDF reports are built from aggregated batch summaries on a background worker
+reports = ReportService()
+
+
+def unknown_tier_response(tier):
+    return JSONResponse(
+        status_code=400,
+        content={"error": f"Unknown model tier '{tier}'. Available tiers: {sorted(MODEL_TIERS)}"}
+    )
+
+
+def overloaded_response(e: Overloaded):
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"error": str(e)},
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
 
 # ===== Input Schema for Single User =====
@@ -32,34 +104,56 @@ class UserInput(BaseModel):
 
 # ======= ROUTES =======
 
-@app.post("/predict")
-async def predict_single(data: UserInput):
-    try:
-        # Convert to DataFrame
-        df = pd.DataFrame([data.dict()])
+def score_fast(model, data: dict):
+    # UserInput already carries the final int-coded features: skip the pandas pipeline
+    probability = model.predict_row(data)
 
-        # Run through preprocessing pipeline
-        processor = ChurnPredictionModel()
-        df = processor._clean_column_names(df)
-        df = processor.standardize_features(df, FEATURE_NAME_MAP)
-        processor.setup_preprocessing(df)
-        df = processor.load_and_preprocess_data(df)
+    # Feature sketches only - the probability baseline belongs to the accurate model
+    if drift_monitor is not None:
+        drift_monitor.update(data)
 
-        # Drop churn column if accidentally added
-        if 'churn' in df.columns:
-            df.drop(columns=['churn'], inplace=True)
+    return {
+        "prediction": int(probability >= model.threshold),
+        "probability": float(round(probability, 4)),
+        "tier": "fast"
+    }
 
-        # Predict + SHAP
-        prediction, probability = make_single_prediction(trained_model, df)
-        explanation = get_shap_values(trained_model, df)
 
-        return {
-            "prediction": int(prediction),
-            "probability": float(round(probability, 4)),
-            "shap": {str(k): float(v) for k, v in explanation.items()}
-        }
+def score_single(model, tier, data: dict):
+    # Convert to DataFrame and run through preprocessing pipeline
+    df = preprocess_for_scoring(pd.DataFrame([data]))
 
+    # Predict + SHAP
+    prediction, probability = make_single_prediction(model, df)
 
+    # Same feature view as score_fast: UserInput already holds the final features, while the
+    # pandas pipeline re-derives several of them from raw columns that are not in the payload
+    if drift_monitor is not None:
+        drift_monitor.update(data, [probability])
+
+    response = {
+        "prediction": int(prediction),
+        "probability": float(round(probability, 4)),
+        "tier": tier
+    }
+    if tier == "accurate":
+        explanation = get_shap_values(model, df)
+        response["shap"] = {str(k): float(v) for k, v in explanation.items()}
+    return response
+
+
+@app.post("/predict")
+async def predict_single(data: UserInput, tier: str = "accurate"):
+    if tier not in MODEL_TIERS:
+        return unknown_tier_response(tier)
+    try:
+        async with admission.interactive():
+            if tier == "fast":
+                # Cheap enough to run on the event loop; a threadpool hop would cost more
+                return score_fast(MODEL_TIERS[tier], data.dict())
+            return await run_in_threadpool(score_single, MODEL_TIERS[tier], tier, data.dict())
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -67,52 +161,137 @@ async def predict_single(data: UserInput):
         )
 
 
+def upload_path(file_obj):
+    """
+    Path a batch worker can open the upload from, and whether it is a copy to delete.
+    Uploads that Starlette already rolled over to an (unnamed) temp file are shared
+    through /proc instead of being copied again; small in-memory ones are written out.
+    """
+    fd = getattr(file_obj, "name", None)
+    if isinstance(fd, int) and os.path.exists(f"/proc/{os.getpid()}/fd/{fd}"):
+        file_obj.flush()
+        return f"/proc/{os.getpid()}/fd/{fd}", False
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        shutil.copyfileobj(file_obj, f)
+        return f.name, True
+
+
+def replace_broken_batch_pool(broken):
+    # Only the first request that sees a dead worker replaces the pool
+    global batch_pool
+    if batch_pool is broken:
+        batch_pool = new_batch_pool()
+        broken.shutdown(wait=False)
+
+
 @app.post("/batch-predict")
-async def batch_predict(file: UploadFile = File(...)):
+async def batch_predict(file: UploadFile = File(...), tier: str = "accurate"):
+    if tier not in MODEL_TIERS:
+        return unknown_tier_response(tier)
     try:
-        df = pd.read_csv(file.file)
+        # The Streamlit client sends gzip-compressed uploads (*.gz)
+        compression = "gzip" if (file.filename or "").endswith(".gz") else None
 
-        # Preprocess
-        processor = ChurnPredictionModel()
-        df = processor._clean_column_names(df)
-        df = processor.standardize_features(df, FEATURE_NAME_MAP)
-        processor.setup_preprocessing(df)
-        df = processor.load_and_preprocess_data(df)
+        # The upload is already spooled to disk; size it before parsing anything into memory
+        if compression:
+            raw_bytes = gzip_uncompressed_size(file.file)
+        else:
+            file.file.seek(0, os.SEEK_END)
+            raw_bytes = file.file.tell()
+            file.file.seek(0)
+        estimated_bytes, estimated_rows = estimate_batch_bytes(raw_bytes)
 
-        # Separate features
-        if 'churn' in df.columns:
-            df = df.drop(columns=['churn'])
+        async with admission.batch(estimated_bytes, estimated_rows):
+            path, is_copy = await run_in_threadpool(upload_path, file.file)
+            pool = batch_pool
+            try:
+                body, summary, batch_drift = await asyncio.get_running_loop().run_in_executor(
+                    pool, batch_worker.score_batch, MODEL_TIER_PATHS[tier], tier, path,
+                    compression, raw_bytes, MODEL_VERSION, DRIFT_BASELINE_PATH if drift_monitor is not None else None
+                )
+            except BrokenProcessPool:
+                # A worker was killed (e.g. by the OOM killer): start a fresh pool for later batches
+                replace_broken_batch_pool(pool)
+                raise Overloaded("Batch worker stopped unexpectedly - retry, or split the file if this repeats",
+                                 retry_after=BATCH_WORKER_RESTART_SECONDS, status_code=503)
+            finally:
+                if is_copy:
+                    os.unlink(path)
 
-        X = df.copy()
-        predictions, probabilities = make_batch_prediction(trained_model, X)
+        if drift_monitor is not None and batch_drift is not None:
+            drift_monitor.merge(batch_drift)
+        reports.store(summary)
+        # Already JSON-encoded by the worker - don't re-serialize large results on the event loop
+        return Response(content=body, media_type="application/json")
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": str(e), "trace": traceback.format_exc()}
+        )
 
-        # Compute SHAP values
-        import shap
-        explainer = shap.TreeExplainer(trained_model)
-        shap_values = explainer.shap_values(X)
 
-        # Convert SHAP values into a list of dictionaries for each row
-        shap_dict_list = pd.DataFrame(shap_values, columns=X.columns).to_dict(orient="records")
+def unknown_result_response(result_id):
+    return JSONResponse(
+        status_code=404,
+        content={"error": f"Unknown result id '{result_id}'. Run /batch-predict first."}
+    )
 
-        # return {"predictions": predictions, "shap": shap_dict_list}
-        result_data = [
-            {
-                "prediction": int(pred),
-                "probability": float(round(prob, 4)),
-                "shap": {str(k): float(v) for k, v in shap_dict.items()}
-            }
-            for pred, prob, shap_dict in zip(predictions, probabilities, shap_dict_list)
-        ]
 
+@app.post("/reports/{result_id}")
+async def create_report(result_id: str):
+    job = reports.submit(result_id)
+    if job is None:
+        return unknown_result_response(result_id)
+    return JSONResponse(status_code=202 if job["status"] != "done" else 200, content=job)
 
-        return {"results": result_data}
 
-    except Exception as e:
+@app.get("/reports/{result_id}")
+async def report_status(result_id: str):
+    job = reports.status(result_id)
+    if job is None:
+        return unknown_result_response(result_id)
+    return job
+
+
+@app.get("/reports/{result_id}/pdf")
+async def download_report(result_id: str):
+    # The file on disk is authoritative: it outlives evicted jobs and server restarts
+    pdf_path = reports.pdf_path(result_id)
+    if not pdf_path.exists():
         return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "trace": traceback.format_exc()}
+            status_code=404,
+            content={"error": f"No finished report for '{result_id}'", "job": reports.status(result_id)}
         )
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename=f"churn_report_{result_id}.pdf"
+    )
+
 
+@app.get("/admission")
+async def admission_stats():
+    return admission.stats()
 
 
+@app.get("/drift")
+async def drift_report():
+    if drift_monitor is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"No drift baseline found at {DRIFT_BASELINE_PATH}"}
+        )
+    return drift_monitor.report()
+
 
+@app.post("/drift/reset")
+async def drift_reset():
+    if drift_monitor is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"No drift baseline found at {DRIFT_BASELINE_PATH}"}
+        )
+    drift_monitor.reset()
+    return {"model_version": drift_monitor.model_version, "reset": True}
@@ -37,6 +37,16 @@ class ChurnPredictionModel:
         self.preprocessor = None
         self.numeric_features = []
         self.categorical_features = []
+        # Optional global fill values {column: value}; when empty, medians/modes
+        # are computed from the DataFrame being processed (see data_pipeline.py)
+        self.fill_values = {}
+
+    def _fill_value(self, df, col, how='median'):
+        if col in self.fill_values:
+            return self.fill_values[col]
+        if how == 'mode':
+            return df[col].mode()[0]
+        return df[col].median()
 
     def _clean_column_names(self, df):
         df.columns = [re.sub(r'[^a-zA-Z0-9]', '', col.lower()) for col in df.columns]
@@ -96,12 +106,14 @@ class ChurnPredictionModel:
             df['contract'] = df['contract'].map(contract_map)
 
             # Fallback if missing
-            if df['contract'].isnull().all():
+            if 'contract' in self.fill_values:
+                df['contract'] = df['contract'].fillna(self.fill_values['contract'])
+            elif df['contract'].isnull().all():
                 df['contract'] = 0
             else:
                 mode_val = df['contract'].mode()
                 if not mode_val.empty:
-                    df['contract'].fillna(mode_val[0], inplace=True)
+                    df['contract'] = df['contract'].fillna(mode_val[0])
                 else:
                     df['contract'] = df['contract'].fillna(0)
 
@@ -126,7 +138,7 @@ class ChurnPredictionModel:
 
         # Then fill as before
         for col in df.select_dtypes(include=['int64', 'float64']).columns:
-            df[col].fillna(df[col].median(), inplace=True)
+            df[col] = df[col].fillna(self._fill_value(df, col))
 
 
         # Sort by customerId if exists
@@ -194,19 +206,28 @@ class ChurnPredictionModel:
         # Clean numeric values
         if 'totalcharges' in df.columns:
             df['totalcharges'] = pd.to_numeric(df['totalcharges'], errors='coerce')
-            df['totalcharges'].fillna(df['totalcharges'].median(), inplace=True)
+            df['totalcharges'] = df['totalcharges'].fillna(self._fill_value(df, 'totalcharges'))
         # Fill missing numeric values with median
         for col in df.select_dtypes(include=['int64', 'float64']).columns:
-            df[col].fillna(df[col].median(), inplace=True)
+            df[col] = df[col].fillna(self._fill_value(df, col))
 
         # Fill missing categorical values with mode
         for col in df.select_dtypes(include=['object', 'category']).columns:
-            df[col].fillna(df[col].mode()[0], inplace=True)
+            df[col] = df[col].fillna(self._fill_value(df, col, how='mode'))
             
         # 
         return df
-    
-    
 
-        
 
+def preprocess_for_scoring(df):
+    """Request-time preprocessing used by the API (and timed by the training notebook)."""
+    processor = ChurnPredictionModel()
+    df = processor._clean_column_names(df)
+    df = processor.standardize_features(df, FEATURE_NAME_MAP)
+    processor.setup_preprocessing(df)
+    df = processor.load_and_preprocess_data(df)
+
+    # Drop churn column if accidentally added
+    if 'churn' in df.columns:
+        df = df.drop(columns=['churn'])
+    return df
@@ -0,0 +1,275 @@
+# utils/report_generator.py
+"""
+PDF churn reports for finished batch predictions.
+
+/batch-predict keeps the BatchSummary of every scored batch (fixed size, no
+per-row data, see utils/batch_summary.py) under a result id. Reports are
+rendered from that summary by a single low-priority worker process, so
+matplotlib never competes with /predict for the API process's GIL. Chart PNGs
+are cached per result hash, so regenerating a report only re-assembles the PDF.
+"""
+
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+import matplotlib.image as mpimg
+
+from utils.batch_summary import RISK_LEVELS, HISTOGRAM_BINS, result_hash
+
+# Colors for RISK_LEVELS, as on the Streamlit dashboard
+RISK_COLORS = ['#e53e3e', '#ed8936', '#48bb78']
+
+REPORT_DIR = Path("reports")
+MAX_STORED_RESULTS = 256
+# Added to the report worker's nice value, so rendering yields the CPU to /predict
+REPORT_NICENESS = 10
+A4_PORTRAIT = (8.27, 11.69)
+
+
+# ===== Charts =====
+
+def _save(fig, path):
+    fig.savefig(path, dpi=150, bbox_inches="tight")
+
+
+def _risk_chart(summary, path):
+    fig = Figure(figsize=(5, 4))
+    ax = fig.subplots()
+    counts = list(summary["risk_distribution"].values())
+    if sum(counts):
+        ax.pie(counts, labels=list(summary["risk_distribution"]), colors=RISK_COLORS,
+               autopct="%1.1f%%", startangle=90)
+    ax.set_title("Risk Level Distribution")
+    _save(fig, path)
+
+
+def _histogram_chart(summary, path):
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    edges = np.linspace(0, 1, HISTOGRAM_BINS + 1)
+    ax.bar(edges[:-1], summary["probability_histogram"], width=np.diff(edges), align="edge",
+           color="#667eea", edgecolor="white")
+    ax.set_title("Churn Probability Distribution")
+    ax.set_xlabel("Churn Probability")
+    ax.set_ylabel("Number of Customers")
+    _save(fig, path)
+
+
+def _drivers_chart(summary, path):
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    drivers = summary["drivers"][::-1]
+    ax.barh([d["feature"] for d in drivers], [d["mean_impact"] for d in drivers],
+            color=["#e53e3e" if d["mean_impact"] > 0 else "#48bb78" for d in drivers])
+    ax.axvline(0, color="#2d3748", linewidth=0.8)
+    ax.set_title("Top Churn Drivers (mean SHAP impact)")
+    _save(fig, path)
+
+
+CHARTS = {
+    "risk_distribution": _risk_chart,
+    "probability_histogram": _histogram_chart,
+    "drivers": _drivers_chart,
+}
+
+
+def render_charts(summary: dict, cache_dir: Path):
+    """Render each chart once per result hash; later calls reuse the cached PNGs."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, render in CHARTS.items():
+        if name == "drivers" and not summary["drivers"]:
+            continue
+        path = cache_dir / f"{name}.png"
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp.png")
+            render(summary, tmp_path)
+            tmp_path.replace(path)
+        paths[name] = path
+    return paths
+
+
+# ===== PDF =====
+
+def _image_page(pdf, title, image_paths):
+    fig = Figure(figsize=A4_PORTRAIT)
+    fig.text(0.5, 0.95, title, ha="center", fontsize=16, weight="bold")
+    height = 0.85 / len(image_paths)
+    for i, path in enumerate(image_paths):
+        ax = fig.add_axes([0.08, 0.9 - (i + 1) * height, 0.84, height * 0.95])
+        ax.imshow(mpimg.imread(path))
+        ax.axis("off")
+    pdf.savefig(fig)
+
+
+def _summary_page(pdf, summary, title):
+    fig = Figure(figsize=A4_PORTRAIT)
+    fig.text(0.5, 0.95, title, ha="center", fontsize=18, weight="bold")
+    fig.text(0.5, 0.92, time.strftime("Generated %Y-%m-%d %H:%M"), ha="center", fontsize=9, color="#4a5568")
+
+    lines = [
+        ("Total Customers", f"{summary['total_customers']:,}"),
+        ("At-Risk Customers", f"{summary['churned']:,}"),
+        ("Churn Rate", f"{summary['churn_rate']:.1f}%"),
+        ("Avg Risk Score", f"{summary['avg_probability']:.1f}%"),
+    ]
+    fig.text(0.08, 0.86, "Executive Summary", fontsize=14, weight="bold")
+    for i, (label, value) in enumerate(lines):
+        fig.text(0.1, 0.82 - i * 0.03, label, fontsize=11)
+        fig.text(0.6, 0.82 - i * 0.03, value, fontsize=11, weight="bold")
+
+    total = max(summary["total_customers"], 1)
+    fig.text(0.08, 0.66, "Risk Analysis Summary", fontsize=14, weight="bold")
+    for i, (level, count) in enumerate(summary["risk_distribution"].items()):
+        fig.text(0.1, 0.62 - i * 0.03, level, fontsize=11, color=RISK_COLORS[i])
+        fig.text(0.6, 0.62 - i * 0.03, f"{count:,} ({count / total * 100:.1f}%)", fontsize=11)
+
+    if summary["drivers"]:
+        fig.text(0.08, 0.5, "Top Churn Drivers", fontsize=14, weight="bold")
+        for i, driver in enumerate(summary["drivers"]):
+            direction = "increases" if driver["mean_impact"] > 0 else "reduces"
+            fig.text(0.1, 0.46 - i * 0.03,
+                     f"{driver['feature']} {direction} churn probability "
+                     f"(mean |impact| {driver['mean_abs_impact']:.3f})", fontsize=10)
+    pdf.savefig(fig)
+
+
+def generate_pdf_report(summary: dict, output_path, title="Customer Churn Analysis Report", chart_dir=None):
+    """
+    Build the PDF report for one batch summary (BatchSummary.to_dict()).
+    :param chart_dir: Root of the chart cache (default: reports/charts)
+    :return: Path of the written PDF
+    """
+    output_path = Path(output_path)
+    chart_dir = Path(chart_dir) if chart_dir else REPORT_DIR / "charts"
+    charts = render_charts(summary, chart_dir / result_hash(summary))
+
+    tmp_path = output_path.with_suffix(".tmp.pdf")
+    with PdfPages(tmp_path) as pdf:
+        _summary_page(pdf, summary, title)
+        _image_page(pdf, "Risk & Probability Distribution",
+                    [charts["risk_distribution"], charts["probability_histogram"]])
+        if "drivers" in charts:
+            _image_page(pdf, "Churn Drivers", [charts["drivers"]])
+    tmp_path.replace(output_path)
+    return output_path
+
+
+# ===== Background worker =====
+
+def prune_report_files(report_dir, max_files):
+    """Keep the newest `max_files` PDFs and chart directories in `report_dir`."""
+    report_dir = Path(report_dir)
+    newest_first = lambda paths: sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+    pdfs = newest_first(report_dir.glob("churn_report_*.pdf"))
+    chart_dirs = newest_first(path for path in (report_dir / "charts").glob("*") if path.is_dir())
+    for path in pdfs[max_files:]:
+        path.unlink(missing_ok=True)
+    for path in chart_dirs[max_files:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def build_report(summary: dict, output_path, report_dir, max_files):
+    """Report worker task: render one PDF, then keep the report directory bounded."""
+    generate_pdf_report(summary, output_path, chart_dir=Path(report_dir) / "charts")
+    prune_report_files(report_dir, max_files)
+
+
+class ReportService:
+    """
+    Keeps recent batch summaries and renders their reports in one low-priority
+    worker process, off the request path. The summaries, the job table and the
+    PDFs and chart directories on disk are all bounded by `max_results`.
+    """
+
+    def __init__(self, report_dir=REPORT_DIR, max_results=MAX_STORED_RESULTS):
+        self.report_dir = Path(report_dir)
+        self.max_results = max_results
+        self._summaries = OrderedDict()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+        # Files may be left over from earlier runs
+        prune_report_files(self.report_dir, self.max_results)
+
+    @staticmethod
+    def _new_executor():
+        # os.nice runs before the worker imports this module (and matplotlib)
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=os.nice,
+            initargs=(REPORT_NICENESS,)
+        )
+
+    def store(self, summary: dict):
+        """Keep a finished batch summary and return its result id."""
+        result_id = result_hash(summary)
+        with self._lock:
+            self._summaries[result_id] = summary
+            self._summaries.move_to_end(result_id)
+            while len(self._summaries) > self.max_results:
+                self._summaries.popitem(last=False)
+        return result_id
+
+    def pdf_path(self, result_id):
+        return self.report_dir / f"churn_report_{result_id}.pdf"
+
+    def submit(self, result_id):
+        """Queue a report; returns the job status or None if the result id is unknown."""
+        with self._lock:
+            job = self._jobs.get(result_id)
+            if job is not None and job["status"] == "queued":
+                return dict(job)
+            if self.pdf_path(result_id).exists():
+                # Requested again: keep it among the newest files on disk
+                self.pdf_path(result_id).touch()
+                self._set_job(result_id, status="done")
+                return dict(self._jobs[result_id])
+            summary = self._summaries.get(result_id)
+            if summary is None:
+                return None
+            self._set_job(result_id, status="queued")
+
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        task = (build_report, summary, self.pdf_path(result_id), self.report_dir, self.max_results)
+        try:
+            future = self._executor.submit(*task)
+        except BrokenProcessPool:
+            # The worker died (e.g. OOM-killed) and took the pool with it: start a new one
+            self._executor = self._new_executor()
+            future = self._executor.submit(*task)
+        future.add_done_callback(lambda f: self._finish(result_id, f))
+        return self.status(result_id)
+
+    def status(self, result_id):
+        with self._lock:
+            job = self._jobs.get(result_id)
+            return dict(job) if job is not None else None
+
+    def _set_job(self, result_id, **fields):
+        job = self._jobs.setdefault(result_id, {"result_id": result_id})
+        job.update(fields)
+        self._jobs.move_to_end(result_id)
+        while len(self._jobs) > self.max_results:
+            self._jobs.popitem(last=False)
+
+    def _finish(self, result_id, future):
+        error = future.exception()
+        with self._lock:
+            if error is None:
+                self._set_job(result_id, status="done")
+            else:
+                self._set_job(result_id, status="failed", error=str(error) or type(error).__name__)